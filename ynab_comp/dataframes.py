@@ -1,11 +1,70 @@
 """Module for everything related to Pandas DataFrames."""
-from datetime import datetime
+from collections import defaultdict
+from functools import lru_cache
 from typing import Callable
 from loguru import logger
+import os
 import sys
 
+import numpy as np
 import pandas as pd
-from thefuzz import fuzz
+from rapidfuzz import fuzz, process
+
+# Amounts in the YNAB and ICA exports are formatted like "-1 234,56 kr" or "1234,56kr"
+_SEK_TRANS = str.maketrans({" ": "", "k": "", "r": "", ",": "."})
+
+
+def _parse_sek(amounts: pd.Series, errors: str = "raise") -> pd.Series:
+    """Parse a Series of Swedish formatted amounts into floats.
+
+    Args:
+        amounts: Amounts formatted like "-1 234,56 kr"
+        errors: How to handle unparsable amounts, as for pd.to_numeric
+    """
+    return pd.to_numeric(amounts.str.translate(_SEK_TRANS), errors=errors)
+
+
+def _to_ore(amounts: pd.Series) -> pd.Series:
+    """Convert a Series of amounts in SEK into integer öre.
+
+    Every DataFrame stores its Amount in öre, so amounts can be compared for equality exactly.
+
+    Args:
+        amounts: Amounts in SEK
+    """
+    return np.rint(amounts * 100).astype(np.int64)
+
+
+@lru_cache(maxsize=4)
+def _load_ynab_tsv(ynab_tsv: str, mtime: float) -> pd.DataFrame:
+    """Read the YNAB .tsv.
+
+    The result is cached, so every account is extracted from the same parse.
+    The modification time is part of the cache key, so a re-downloaded file is read again.
+
+    Args:
+        ynab_tsv: Path to the .tsv file
+        mtime: Modification time of the .tsv file
+    """
+    ynab_df = pd.read_csv(
+        ynab_tsv,
+        sep="\t",
+        engine="pyarrow",
+        usecols=["Account", "Date", "Payee", "Outflow", "Inflow", "Memo"],
+        parse_dates=["Date"],
+        dtype={
+            "Account": "category",
+            "Payee": "string[pyarrow]",
+            "Outflow": "string[pyarrow]",
+            "Inflow": "string[pyarrow]",
+            "Memo": "string[pyarrow]",
+        },
+    )
+
+    # The pyarrow engine reads an empty quoted cell as "" (unless the whole column is empty), make them all NA
+    ynab_df[["Payee", "Memo"]] = ynab_df[["Payee", "Memo"]].replace("", pd.NA)
+
+    return ynab_df
 
 
 def extract_ynab_df(ynab_tsv: str, account: str, filter_date: str) -> pd.DataFrame:
@@ -19,33 +78,38 @@ def extract_ynab_df(ynab_tsv: str, account: str, filter_date: str) -> pd.DataFra
         account: Name of the YNAB Account for which you want to extract transactions
         filter_date: Earliest date to take into consideration when parsing
     """
-    ynab_df = pd.read_csv(ynab_tsv, sep="\t", index_col=False)
-
-    filtered_ynab_df = ynab_df.loc[(ynab_df["Date"] >= filter_date) & (ynab_df["Account"] == account)]
-
-    logger.debug(f"Sample of YNAB data for account {account}:\n{filtered_ynab_df.head(5)}")
-
-    data_of_interest_df = filtered_ynab_df[["Date", "Payee", "Outflow", "Inflow", "Memo"]]
-    data_of_interest_df.columns = ["Date", "Description", "Outflow", "Inflow", "Memo"]
-    logger.debug(f"Parsed YNAB data:\n{data_of_interest_df.head(5)}")
+    ynab_df = _load_ynab_tsv(ynab_tsv, os.path.getmtime(ynab_tsv))
+
+    data_of_interest_df = ynab_df.loc[
+        (ynab_df["Date"] >= pd.Timestamp(filter_date)) & (ynab_df["Account"] == account),
+        ["Date", "Payee", "Outflow", "Inflow", "Memo"],
+    ].rename(columns={"Payee": "Description"})
+    logger.opt(lazy=True).debug(
+        "Sample of YNAB data for account {}:\n{}", lambda: account, lambda: data_of_interest_df.head(5)
+    )
+
+    inflow_amount = _parse_sek(data_of_interest_df["Inflow"], errors="coerce")
+    outflow_amount = _parse_sek(data_of_interest_df["Outflow"], errors="coerce")
+
+    unparsable = inflow_amount.isna() | outflow_amount.isna()
+    if unparsable.any():  # you'll end up here if you have an empty row in YNAB
+        unparsable_df = data_of_interest_df.loc[unparsable]
+        for bad_inflow, bad_outflow in zip(unparsable_df["Inflow"], unparsable_df["Outflow"]):
+            logger.error("Unable to parse inflow/outflow: {}/{}.", bad_inflow, bad_outflow)
+        raise ValueError(f"Unable to parse inflow/outflow of {unparsable.sum()} YNAB transactions.")
 
     # It is important that every DataFrame have the same Column names (Date, Description, Amount, Memo)
-    parsed_df = pd.DataFrame(columns=["Date", "Description", "Amount", "Memo"])
-
-    for idx, row in data_of_interest_df.iterrows():
-        inflow = row["Inflow"].rstrip("kr").replace(",", ".")
-        outflow = row["Outflow"].rstrip("kr").replace(",", ".")
-        try:  # you'll end up in the except if you have an empty row in YNAB
-            amount = float(inflow) - float(outflow)
-        except ValueError as e:
-            logger.error(f"Unable to parse inflow/outflow: {inflow}/{outflow}.")
-            logger.error(f"Error: {e}")
-            raise
-
-        parsed_df.loc[idx] = [row["Date"], row["Description"].lower(), amount, row["Memo"]]
-
-    logger.info(f"Extracted {len(parsed_df.index)} entries from YNAB, for account {account}.")
-    logger.debug(f"YNAB Data:\n{parsed_df.head(5)}")
+    parsed_df = pd.DataFrame(
+        {
+            "Date": data_of_interest_df["Date"],
+            "Description": data_of_interest_df["Description"].str.lower(),
+            "Amount": _to_ore(inflow_amount - outflow_amount),
+            "Memo": data_of_interest_df["Memo"],
+        }
+    )
+
+    logger.info("Extracted {} entries from YNAB, for account {}.", len(parsed_df.index), account)
+    logger.opt(lazy=True).debug("YNAB Data:\n{}", lambda: parsed_df.head(5))
 
     return parsed_df
 
@@ -62,10 +126,11 @@ def extract_swedbank_df(swedbank_csv: str, filter_date: str) -> pd.DataFrame:
         the actual data.
         2. The file is encoded using cp1252 (Windows 1252 encoding).
 
-    If you just download the file and run the script, the script attempts to
-    open the file, remove the first line, and re-encode the file as UTF-8.
-    However, if you remove the first line yourself but save the file as
-    cp1252, Pandas must open the file with unicode_espace. (Hence the try/except.)
+    If you just download the file and run the script, the script skips the
+    first line and reads the file as cp1252, without modifying it.
+    However, if you remove the first line yourself, the file may have been
+    saved as either UTF-8 or cp1252, so we try UTF-8 first and fall back on
+    cp1252. (Hence the try/except.)
 
     I hope this makes the parsing more robust.
 
@@ -74,34 +139,47 @@ def extract_swedbank_df(swedbank_csv: str, filter_date: str) -> pd.DataFrame:
         filter_date: Earliest date to take into consideration when parsing
     """
 
+    # Unlike the other exports, this is read with the default engine, since the pyarrow
+    # engine neither skips the extra line nor decodes cp1252
+    read_csv_kwargs = {
+        "usecols": ["Bokföringsdag", "Beskrivning", "Referens", "Belopp", "Bokfört saldo"],
+        "parse_dates": ["Bokföringsdag"],
+        "dtype": {
+            "Beskrivning": "string[pyarrow]",
+            "Referens": "string[pyarrow]",
+            "Belopp": "float64",
+            "Bokfört saldo": "float64",
+        },
+    }
+
     # Encoding fixing and data stripping (explained in docstring)
-    with open(swedbank_csv, encoding="cp1252") as sb_csv:
-        data = sb_csv.readlines()
-
-    if "* Transaktioner" in data[0]:
-        data = "".join(data[1:])
-        with open(swedbank_csv, "w", encoding="utf-8") as sb_csv:
-            sb_csv.write(data)
-
-    try:
-        swedbank_df = pd.read_csv(swedbank_csv)
-    except KeyError:
-        swedbank_df = pd.read_csv(swedbank_csv, encoding="unicode_escape")
+    with open(swedbank_csv, "rb") as sb_csv:
+        first_line = sb_csv.readline()
+
+    if b"* Transaktioner" in first_line:
+        swedbank_df = pd.read_csv(swedbank_csv, encoding="cp1252", skiprows=1, **read_csv_kwargs)
+    else:
+        try:
+            swedbank_df = pd.read_csv(swedbank_csv, **read_csv_kwargs)
+        except ValueError:  # UnicodeDecodeError, or column names mangled by the encoding
+            swedbank_df = pd.read_csv(swedbank_csv, encoding="cp1252", **read_csv_kwargs)
     # End of Encoding and data stripping
 
     saldo = float(swedbank_df["Bokfört saldo"].iloc[0])
-    logger.info(f"Swedbank Saldo: {saldo} SEK")
-
-    filtered_swedbank_df = swedbank_df.loc[(swedbank_df["Bokföringsdag"] >= filter_date)][
-        ["Bokföringsdag", "Beskrivning", "Referens", "Belopp"]
-    ]
-    filtered_swedbank_df.columns = ["Date", "Description", "Reference", "Amount"]
+    logger.info("Swedbank Saldo: {} SEK", saldo)
+
+    filtered_swedbank_df = swedbank_df.loc[
+        swedbank_df["Bokföringsdag"] >= pd.Timestamp(filter_date),
+        ["Bokföringsdag", "Beskrivning", "Referens", "Belopp"],
+    ].rename(
+        columns={"Bokföringsdag": "Date", "Beskrivning": "Description", "Referens": "Reference", "Belopp": "Amount"}
+    )
     filtered_swedbank_df["Description"] = filtered_swedbank_df["Description"].str.lower()
     filtered_swedbank_df["Reference"] = filtered_swedbank_df["Reference"].str.lower()
-    filtered_swedbank_df["Amount"] = filtered_swedbank_df["Amount"].astype(float)
+    filtered_swedbank_df["Amount"] = _to_ore(filtered_swedbank_df["Amount"])
 
-    logger.info(f"Extracted {len(filtered_swedbank_df.index)} entries from Swedbank")
-    logger.debug(f"Data:\n{filtered_swedbank_df.head(5)}")
+    logger.info("Extracted {} entries from Swedbank", len(filtered_swedbank_df.index))
+    logger.opt(lazy=True).debug("Data:\n{}", lambda: filtered_swedbank_df.head(5))
 
     return filtered_swedbank_df
 
@@ -115,146 +193,187 @@ def extract_ica_df(ica_csv: str, filter_date: str) -> pd.DataFrame:
         ica_csv: Path to the .csv file
         filter_date: Earliest date to take into consideration when parsing
     """
-    ica_df = pd.read_csv(ica_csv, sep=";")
-
-    idx = 0
-
-    # ICA exports "waiting transactions"
-    # We loop until we find the first "none NaN" row
-    while True:
-        saldo = str(ica_df["Saldo"].iloc[idx])
-        if saldo != "nan":
-            break
-        idx += 1
-
-    saldo = float(saldo.replace("kr", "").replace(",", ".").replace(" ", ""))
-    logger.info(f"ICA Saldo: {saldo} SEK")
-
-    filtered_ica_df = ica_df.loc[(ica_df["Datum"] >= filter_date)][["Datum", "Text", "Belopp"]]
-
-    filtered_ica_df.columns = ["Date", "Description", "Amount"]
+    ica_df = pd.read_csv(
+        ica_csv,
+        sep=";",
+        engine="pyarrow",
+        usecols=["Datum", "Text", "Belopp", "Saldo"],
+        parse_dates=["Datum"],
+        dtype={"Text": "string[pyarrow]", "Belopp": "string[pyarrow]"},
+    )
+
+    # The pyarrow engine reads empty cells as "" rather than NaN
+    ica_df["Text"] = ica_df["Text"].replace("", pd.NA)
+
+    # ICA exports "waiting transactions", which have no Saldo
+    # We use the first "none NaN" row
+    saldos = ica_df["Saldo"].replace("", np.nan)
+    saldo = str(saldos.loc[saldos.first_valid_index()])
+    saldo = float(saldo.translate(_SEK_TRANS))
+    logger.info("ICA Saldo: {} SEK", saldo)
+
+    filtered_ica_df = ica_df.loc[
+        ica_df["Datum"] >= pd.Timestamp(filter_date),
+        ["Datum", "Text", "Belopp"],
+    ].rename(columns={"Datum": "Date", "Text": "Description", "Belopp": "Amount"})
     filtered_ica_df["Description"] = filtered_ica_df["Description"].str.lower()
 
     # The Reference column does not exist, but we use it in the Swedbank export
     # hence we add it here (empty) for consistency.
     filtered_ica_df["Reference"] = ""
 
-    # This is hacky, and tacky, but it works...
-    filtered_ica_df["Amount"] = filtered_ica_df["Amount"].map(lambda a: a.replace("kr", ""))
-    filtered_ica_df["Amount"] = filtered_ica_df["Amount"].map(lambda a: a.replace(",", "."))
-    filtered_ica_df["Amount"] = filtered_ica_df["Amount"].map(lambda a: a.replace(" ", ""))
-    filtered_ica_df["Amount"] = filtered_ica_df["Amount"].astype(float)
+    filtered_ica_df["Amount"] = _to_ore(_parse_sek(filtered_ica_df["Amount"]))
 
-    logger.info(f"Extracted {len(filtered_ica_df.index)} entries from ICA")
+    logger.info("Extracted {} entries from ICA", len(filtered_ica_df.index))
 
     return filtered_ica_df
 
 
-def compare_frames(frame_1: pd.DataFrame, frame_2: pd.DataFrame, printing: bool = False) -> pd.DataFrame:
+def _partial_ratio(s1: str, s2: str) -> float:
+    """Compute the fuzzy partial ratio of two strings, the way thefuzz does.
+
+    The shorter string is only compared with windows of the longer string that are as long as itself.
+    (RapidFuzz' partial_ratio also compares it with shorter windows at the ends of the longer string,
+    which lets e.g. "sj" score 67 against "swish till anna".) Empty strings have a ratio of 0.
+    """
+    if pd.isna(s1) or pd.isna(s2) or not s1 or not s2:
+        return 0
+    shorter, longer = sorted((s1, s2), key=len)
+    windows = (longer[start : start + len(shorter)] for start in range(len(longer) - len(shorter) + 1))
+    return max(fuzz.ratio(shorter, window) for window in windows)
+
+
+def _partial_ratios(query: str, choices: np.ndarray) -> np.ndarray:
+    """Compute the fuzzy partial ratio (as _partial_ratio) between the query and every choice.
+
+    RapidFuzz' partial_ratio is never lower than _partial_ratio, so every choice is first scored with it
+    in a single call, and only the few above the cutoff are scored again. Ratios below 65 are reported as 0.
+    """
+    if pd.isna(query) or not query:
+        return np.zeros(len(choices))
+    ratios = process.cdist([query], choices, scorer=fuzz.partial_ratio, score_cutoff=65)[0]
+    for pos in np.flatnonzero(ratios):
+        ratios[pos] = _partial_ratio(query, choices[pos])
+    ratios[ratios < 65] = 0
+    return ratios
+
+
+def compare_frames(
+    frame_1: pd.DataFrame, frame_2: pd.DataFrame, name_1: str, name_2: str, printing: bool = False
+) -> pd.DataFrame:
     """Check whether transactions in frame 1 are also present in frame 2.
 
     Args:
         frame_1: The DataFrame used as "the truth".
         frame_2: The DataFrame in which transactions can be missing.
+        name_1: Where the transactions in frame_1 come from, e.g. "YNAB"
+        name_2: Where the transactions in frame_2 come from, e.g. "Swedbank"
     Returns:
         A DataFrame containing the transactions from frame_1, not found in frame_2.
     """
 
-    not_found = pd.DataFrame(columns=["Date", "Description", "Amount"])
+    missing_rows = []
 
-    for _, transaction_1 in frame_1.iterrows():
-        logger.debug(
-            f"Verifying transaction: {transaction_1['Description']} from {transaction_1['Date']} @ {transaction_1['Amount']}"
-        )
+    # Index the positions in frame_2 by Amount once, instead of scanning it for every transaction in frame_1
+    amount_index = defaultdict(list)
+    for pos_2, amount_2 in enumerate(frame_2["Amount"].to_numpy()):
+        amount_index[amount_2].append(pos_2)
 
-        found = False
-        amount_1 = transaction_1["Amount"]
+    # Positions in frame_2 that have not (yet) been matched to a transaction in frame_1
+    available = np.ones(len(frame_2), dtype=bool)
 
-        matching_amount = frame_2.loc[frame_2["Amount"] == amount_1]
-        logger.debug(f" > Found {len(matching_amount)} rows with amount {amount_1}")
+    # Extract the columns of frame_2 once, they are indexed by position in the loop
+    dates_2 = frame_2["Date"].to_numpy()
+    descriptions_2 = frame_2["Description"].to_numpy()
+    memos_2 = frame_2["Memo"].fillna("").to_numpy() if "Memo" in frame_2 else None
 
-        for idx_2, transaction_2 in matching_amount.iterrows():
-            logger.debug(
-                f" > {transaction_1['Description']} and {transaction_2['Description']} have the same amount: {amount_1}"
-            )
+    # Only the bank exports have a Reference; reindex adds it as an empty column to the YNAB data
+    transactions_1 = frame_1.reindex(columns=["Date", "Description", "Amount", "Reference"])
 
-            if len(matching_amount) == 1:
-                logger.debug(f" >> Considering uniqueness to be enough. Dropping!")
-                frame_2.drop(idx_2, inplace=True)
-                found = True
-                break
+    for date_1, description_1, amount_1, reference_1 in transactions_1.itertuples(index=False, name=None):
+        logger.debug("Verifying transaction: {} from {:%Y-%m-%d} @ {:.2f}", description_1, date_1, amount_1 / 100)
 
-            t1 = datetime.strptime(transaction_1["Date"], "%Y-%m-%d")
-            t2 = datetime.strptime(transaction_2["Date"], "%Y-%m-%d")
-            t_diff = t1 - t2
-            logger.debug(f" > The difference in time between the two transactions is: {t_diff.days}")
+        found = False
 
-            if abs(t_diff.days) > 7:
-                logger.debug(f" >> Considering the transactions to be too distant. Moving on.")
-                continue
+        candidates = [pos_2 for pos_2 in amount_index.get(amount_1, []) if available[pos_2]]
+        logger.debug(" > Found {} rows with amount {:.2f}", len(candidates), amount_1 / 100)
 
-            # Compare with Description
-            f_ratio = fuzz.partial_ratio(transaction_1["Description"], transaction_2["Description"])
-            logger.debug(
-                f" > {transaction_1['Description']} and {transaction_2['Description']} have Fuzz Ratio: {f_ratio}"
-            )
+        if len(candidates) == 1:
+            logger.debug(" >> Considering uniqueness to be enough. Dropping!")
+            available[candidates[0]] = False
+            found = True
 
-            if f_ratio > 65:
-                logger.debug(f" >> Considering the transactions to be similar enough. Dropping!")
-                frame_2.drop(idx_2, inplace=True)
-                found = True
-                break
-
-            # Compare Description in bank statement with Memo field in YNAB
-            if "Memo" in transaction_2 and not pd.isna(transaction_2["Memo"]):
-                logger.debug(f" > Unable to find match in Description, trying Memo: {transaction_2['Memo']}")
-                f_ratio = fuzz.partial_ratio(transaction_1["Description"], transaction_2["Memo"])
-                logger.debug(
-                    f" > {transaction_1['Description']} and {transaction_2['Memo']} have Fuzz Ratio: {f_ratio}"
-                )
-
-                if f_ratio > 65:
-                    logger.debug(f" >> Considering the transactions to be similar enough. Dropping!")
-                    frame_2.drop(idx_2, inplace=True)
-                    found = True
-                    break
+        elif candidates:
+            date_diffs = dates_2[candidates] - date_1.to_datetime64()
+            days_apart = np.abs(date_diffs.astype("timedelta64[D]").astype(np.int64))
+            logger.debug(" > The difference in time to the candidates is: {}", days_apart)
+
+            # Candidates that are too distant in time are never considered
+            close_in_time = days_apart <= 7
+            candidates = np.asarray(candidates)[close_in_time]
+            logger.debug(" > {} of them are within 7 days", len(candidates))
 
-                # Compare "Reference" in bank statement with Memo field in YNAB
-                if not pd.isna(transaction_1['Reference']):
-                    logger.debug(f" > Unable to find match in Description, trying Reference: {transaction_1['Reference']}")
-                    f_ratio = fuzz.partial_ratio(transaction_1["Reference"], transaction_2["Memo"])
-                    logger.debug(f" > {transaction_1['Reference']} and {transaction_2['Memo']} have Fuzz Ratio: {f_ratio}")
+            if len(candidates) == 1:
+                logger.debug(" >> Considering uniqueness within 7 days to be enough. Dropping!")
+                available[candidates[0]] = False
+                found = True
 
-                    if f_ratio > 65:
-                        logger.debug(f" >> Considering the transactions to be similar enough. Dropping!")
-                        frame_2.drop(idx_2, inplace=True)
-                        found = True
-                        break
+            elif len(candidates) > 1:
+                # Compare with Description
+                f_ratios = _partial_ratios(description_1, descriptions_2[candidates])
+                logger.debug(" > Fuzz Ratios of the candidates' Description: {}", f_ratios)
+                similar = f_ratios > 65
+
+                # Compare Description and "Reference" in bank statement with Memo field in YNAB
+                if memos_2 is not None:
+                    memos = memos_2[candidates]
+                    # An empty Memo is a perfect partial match for an empty string, so it is never compared
+                    has_memo = memos != ""
+                    f_ratios = _partial_ratios(description_1, memos)
+                    logger.debug(" > Fuzz Ratios of the candidates' Memo: {}", f_ratios)
+                    similar |= has_memo & (f_ratios > 65)
+
+                    if not pd.isna(reference_1) and reference_1 != "":
+                        f_ratios = _partial_ratios(reference_1, memos)
+                        logger.debug(" > Fuzz Ratios of the candidates' Memo, using Reference: {}", f_ratios)
+                        similar |= has_memo & (f_ratios > 65)
+
+                # The first candidate, in the order of frame_2, that is similar enough
+                hits = np.flatnonzero(similar)
+                if hits.size:
+                    logger.debug(" >> Considering the transactions to be similar enough. Dropping!")
+                    available[candidates[hits[0]]] = False
+                    found = True
 
         if not found:
-            logger.warning(f" > Did not find: {amount_1} | {transaction_1['Description']} @ {transaction_1['Date']}")
-            missing_row = {
-                "Date": transaction_1["Date"],
-                "Description": transaction_1["Description"],
-                "Amount": amount_1,
-            }
-            not_found = not_found.append(missing_row, ignore_index=True)
+            logger.warning(
+                " > Did not find {} transaction in {}: {:.2f} | {} @ {:%Y-%m-%d}",
+                name_1,
+                name_2,
+                amount_1 / 100,
+                description_1,
+                date_1,
+            )
+            missing_rows.append((date_1, description_1, amount_1))
+
+    # Matched transactions are consumed from frame_2, leaving only the unmatched ones
+    frame_2.drop(frame_2.index[~available], inplace=True)
 
-    return not_found
+    return pd.DataFrame(missing_rows, columns=["Date", "Description", "Amount"])
 
 
 def compare_ynab_to_bank(
-    ynab_tsv: str,
+    ynab: pd.DataFrame,
     ynab_account: str,
     bank_file: str,
     bank_name: str,
     extraction_function: Callable[[str, str], pd.DataFrame],
     filter_date: str,
 ) -> None:
-    """Compare a YNAB .tsv file to a bank's transaction excerpt.
+    """Compare the transactions of a YNAB Account to a bank's transaction excerpt.
 
     Args:
-        ynab_tsv: Path to YNAB .tsv file
+        ynab: The transactions of the YNAB Account, as extracted by extract_ynab_df
         ynab_account: Name of YNAB Account of interest
         bank_file: Path to the bank transaction file
         bank_name: Name of bank
@@ -262,32 +381,31 @@ def compare_ynab_to_bank(
         filter_date: Earliest date to take into consideration
 
     """
-    logger.info(f"Comparing YNAB Account: {ynab_account}, to data from {bank_name}.")
+    logger.info("Comparing YNAB Account: {}, to data from {}.", ynab_account, bank_name)
 
-    ynab = extract_ynab_df(ynab_tsv, ynab_account, filter_date)
     bank = extraction_function(bank_file, filter_date)
 
     # Just ensure both frames are sorted in the same direction
     ynab.sort_values(by="Date")
     bank.sort_values(by="Date")
 
-    in_bank_not_ynab = compare_frames(bank, ynab, printing=False)
+    in_bank_not_ynab = compare_frames(bank, ynab, bank_name, "YNAB", printing=False)
 
     if not in_bank_not_ynab.empty:
         logger.warning(
-            f"There are {len(in_bank_not_ynab)} transactions found in the " f"{bank_name} export, but not in YNAB."
+            "There are {} transactions found in the {} export, but not in YNAB.", len(in_bank_not_ynab), bank_name
         )
     else:
-        logger.info(f"There are no transactions in {bank_name} that are not also in YNAB.")
+        logger.info("There are no transactions in {} that are not also in YNAB.", bank_name)
 
-    in_ynab_not_bank = compare_frames(ynab, bank, printing=False)
+    in_ynab_not_bank = compare_frames(ynab, bank, "YNAB", bank_name, printing=False)
 
     if not in_ynab_not_bank.empty:
         logger.warning(
-            f"There are {len(in_ynab_not_bank)} transactions found in YNAB, but not in the {bank_name} export."
+            "There are {} transactions found in YNAB, but not in the {} export.", len(in_ynab_not_bank), bank_name
         )
     else:
-        logger.info(f"There are no transactions in YNAB that are not also in {bank_name}.")
+        logger.info("There are no transactions in YNAB that are not also in {}.", bank_name)
 
     if in_bank_not_ynab.empty and in_ynab_not_bank.empty:
-        logger.info(f"{bank_name} has no deviating transactions!")
+        logger.info("{} has no deviating transactions!", bank_name)
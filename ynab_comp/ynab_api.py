@@ -1,98 +1,223 @@
-from typing import List
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
 from loguru import logger
-from requests import get
+import orjson
+import os
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+YNAB_API_URL = "https://api.youneedabudget.com/v1"
+YNAB_TOKEN_PATH = Path("data/token.api")
+YNAB_KNOWLEDGE_PATH = Path("data/ynab_knowledge.json")
+
+# The header of the .tsv export from the YNAB Web App
+YNAB_TSV_HEADER = (
+    b'"Account"\t"Flag"\t"Date"\t"Payee"\t"Category Group/Category"\t"Category Group"\t"Category"\t'
+    b'"Memo"\t"Outflow"\t"Inflow"\t"Cleared"\n'
+)
+
+# A row of the .tsv, formatted the same way as the header
+# The API only gives the category name, which fills all three category columns
+_format_tsv_fields = '"{0}"\t"{1}"\t"{2}"\t"{3}"\t"{4}"\t"{4}"\t"{4}"\t"{5}"\t{6}\t{7}\t"{8}"\n'.format
+
+# The fields of a transaction that are kept: those written to the .tsv, and those needed to merge downloads
+YNAB_TRANSACTION_FIELDS = (
+    "id", "deleted", "account_name", "flag_color", "date", "payee_name", "category_name", "memo", "cleared", "amount"
+)
+
+# The fields of a transaction that are written to the .tsv
+_tsv_fields = itemgetter(
+    "account_name", "flag_color", "date", "payee_name", "category_name", "memo", "cleared", "amount"
+)
 
 
 class YNABError(Exception):
     pass
 
 
-def get_api_token() -> str:
-    """Read the data/token.api file and return the token."""
-    try:
-        with open("data/token.api") as api_f:
-            return api_f.read().strip()
-    except FileNotFoundError:
-        return None
+@lru_cache(maxsize=1)
+def get_api_token() -> Optional[str]:
+    """Read the data/token.api file and return the token, or None if there is no such file."""
+    return YNAB_TOKEN_PATH.read_text().strip() if YNAB_TOKEN_PATH.is_file() else None
 
 
 def download_ynab_data(token: str, budget_name: str, filter_date: str) -> None:
     """Download the YNAB data of interest and store it as data/ynab_api.tsv.
 
+    Only the transactions that changed since the previous download are
+    fetched, as long as that download was for the same budget and date.
+
     Args:
         token: The YNAB API Token (acquired at their development page)
         budget_name: The name of the YNAB Budget to fetch transactions from
         filter_date: The earliest date to consider transactions from
     """
 
-    API_URL = "https://api.youneedabudget.com/v1"
+    logger.info("Downloading YNAB data for budget: {}", budget_name)
+    with create_ynab_session(token) as session:
+        ynab_budget = get_ynab_budget(YNAB_API_URL, session, budget_name)
+
+        ynab_budget_id = ynab_budget["id"]
+        last_knowledge, known_transactions = load_ynab_knowledge(ynab_budget_id, filter_date)
+        ynab_budget_transactions, server_knowledge = get_ynab_budget_transactions(
+            YNAB_API_URL, session, ynab_budget_id, filter_date, last_knowledge
+        )
+
+    for transaction in ynab_budget_transactions:
+        if transaction.get("deleted"):
+            known_transactions.pop(transaction["id"], None)
+        else:
+            known_transactions[transaction["id"]] = transaction
+
+    store_ynab_transactions_as_csv(sorted(known_transactions.values(), key=lambda t: t["date"]))
+    store_ynab_knowledge(ynab_budget_id, filter_date, server_knowledge, known_transactions)
+
+
+def create_ynab_session(token: str) -> Session:
+    """Create a Session that authenticates against the YNAB API.
 
-    logger.info(f"Downloading YNAB data for budget: {budget_name}")
-    ynab_budget = get_ynab_budget(API_URL, token, budget_name)
+    All requests made with the Session reuse the same connection, ask for a
+    compressed response, and transient errors (e.g. rate limiting) are
+    retried with a backoff.
 
-    ynab_budget_id = ynab_budget["id"]
-    ynab_budget_transactions = get_ynab_budget_transactions(
-        API_URL, token, ynab_budget_id, filter_date
+    Args:
+        token: The YNAB API Token (acquired at their development page)
+    Returns:
+        The authenticated Session
+    """
+
+    session = Session()
+    session.headers.update(
+        {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            # The JSON compresses well, and requests decompresses it transparently
+            "Accept-Encoding": "gzip, deflate",
+        }
     )
-    store_ynab_transactions_as_csv(ynab_budget_transactions)
+
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retries))
+
+    return session
 
 
-def get_ynab_budget(api_url: str, token: str, budget_name: str) -> str:
+def get_ynab_budget(api_url: str, session: Session, budget_name: str) -> str:
     """Ensure the budget of interest is available in YNAB.
 
     Args:
         api_url: URL for YNAB API
-        token: The YNAB API Token (acquired at their development page)
+        session: Session authenticated against the YNAB API
         budget_name: The name of the YNAB Budget to fetch transactions from
     Returns:
         Budget JSON object from which the budget id can be fetched
     """
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-    }
-
     budget_url = api_url + "/budgets"
 
-    response = get(budget_url, headers=headers)
-    json_content = response.json()
+    response = session.get(budget_url)
+    json_content = orjson.loads(response.content)
+
+    budgets = json_content["data"]["budgets"]
+    budget = next((budget for budget in budgets if budget["name"] == budget_name), None)
 
-    for budget in json_content["data"]["budgets"]:
-        if budget["name"] == budget_name:
-            return budget
+    if budget is None:
+        raise YNABError(f"Unable to find budget: {budget_name}")
 
-    raise YNABError(f"Unable to find budget: {budget_name}")
+    return budget
 
 
 def get_ynab_budget_transactions(
-    api_url: str, token: str, budget_id: str, filter_date=None
-) -> List[str]:
-    """
+    api_url: str, session: Session, budget_id: str, filter_date=None, last_knowledge=None
+) -> Tuple[List[dict], int]:
+    """Fetch the transactions of a budget.
 
     Args:
         api_url: URL for YNAB API
-        token: The YNAB API Token (acquired at their development page)
+        session: Session authenticated against the YNAB API
         budget_id: The id of the YNAB Budget to fetch transactions for
         filter_date: The earliest date to consider transactions from
+        last_knowledge: Server knowledge from a previous fetch, to only fetch what changed since then
     Returns:
-        A list of JSON objects where each object corresponds to a transaction
+        A list of JSON objects where each object corresponds to a transaction,
+        and the server knowledge to use for the next fetch
     """
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-    }
-    params = {}
+    query_url = f"{api_url}/budgets/{budget_id}/transactions"
 
-    query_url = api_url + f"/budgets/{budget_id}/transactions"
+    params = {}
     if filter_date:
         params["since_date"] = filter_date
+    if last_knowledge:
+        params["last_knowledge_of_server"] = last_knowledge
+    if params:
+        query_url = f"{query_url}?{urlencode(params)}"
+
+    response = session.get(query_url)
+    json_content = orjson.loads(response.content)
+    # Only keep the fields that are used, the rest (e.g. subtransactions) are dropped right away
+    json_transactions = [
+        {field: transaction.get(field) for field in YNAB_TRANSACTION_FIELDS}
+        for transaction in json_content["data"]["transactions"]
+    ]
+
+    logger.info("Fetched {} transactions", len(json_transactions))
+    return json_transactions, json_content["data"]["server_knowledge"]
 
-    response = get(query_url, headers=headers, params=params)
-    json_content = response.json()
-    json_transactions = json_content["data"]["transactions"]
 
-    logger.info(f"Fetched {len(json_transactions)} transactions")
-    return json_transactions
+def load_ynab_knowledge(budget_id: str, filter_date: str) -> Tuple[Optional[int], Dict[str, dict]]:
+    """Load the server knowledge and transactions stored by the previous download.
+
+    Nothing is loaded if the previous download was for another budget or date,
+    or if the stored file cannot be read.
+
+    Args:
+        budget_id: The id of the YNAB Budget being downloaded
+        filter_date: The earliest date to consider transactions from
+    Returns:
+        The server knowledge (or None) and the known transactions, by id
+    """
+    try:
+        knowledge = orjson.loads(YNAB_KNOWLEDGE_PATH.read_bytes())
+        if knowledge["budget_id"] != budget_id or knowledge["since_date"] != filter_date:
+            return None, {}
+        return knowledge["server_knowledge"], dict(knowledge["transactions"])
+    except FileNotFoundError:
+        return None, {}
+    except (OSError, KeyError, TypeError, ValueError) as error:  # orjson.JSONDecodeError is a ValueError
+        logger.warning("Ignoring unreadable {} ({!r}), downloading all transactions.", YNAB_KNOWLEDGE_PATH, error)
+        return None, {}
+
+
+def store_ynab_knowledge(
+    budget_id: str, filter_date: str, server_knowledge: int, transactions: Dict[str, dict]
+) -> None:
+    """Store the server knowledge and transactions, for the next download to start from.
+
+    The file is replaced atomically, so an interrupted write never leaves a
+    knowledge file that does not match the transactions in it.
+
+    Args:
+        budget_id: The id of the downloaded YNAB Budget
+        filter_date: The earliest date transactions were downloaded from
+        server_knowledge: The server knowledge returned by the download
+        transactions: The downloaded transactions, by id
+    """
+    knowledge = {
+        "budget_id": budget_id,
+        "since_date": filter_date,
+        "server_knowledge": server_knowledge,
+        "transactions": transactions,
+    }
+
+    tmp_path = YNAB_KNOWLEDGE_PATH.with_suffix(".json.tmp")
+    tmp_path.write_bytes(orjson.dumps(knowledge))
+    os.replace(tmp_path, YNAB_KNOWLEDGE_PATH)
 
 
 def store_ynab_transactions_as_csv(ynab_transactions: str):
@@ -108,50 +233,31 @@ def store_ynab_transactions_as_csv(ynab_transactions: str):
         ynab_transactions: A list of JSON objects where each object corresponds to a transaction
     """
     ynab_tsv_path = "data/ynab_api.tsv"
-    logger.info(f"Writing YNAB Transactions to: {ynab_tsv_path}")
-
-    with open(ynab_tsv_path, "w", newline="") as csv_fh:
-
-        csv_fh.write(
-            '"Account"\t'
-            + '"Flag"\t'
-            + '"Date"\t'
-            + '"Payee"\t'
-            + '"Category Group/Category"\t'
-            + '"Category Group"\t'
-            + '"Category"\t'
-            + '"Memo"\t'
-            + '"Outflow"\t'
-            + '"Inflow"\t'
-            + '"Cleared"\n'
-        )
+    logger.info("Writing YNAB Transactions to: {}", ynab_tsv_path)
+
+    # Every row is formatted, encoded and written in the same pass, through a large buffer
+    with open(ynab_tsv_path, "wb", buffering=1 << 20) as csv_fh:
+        csv_fh.write(YNAB_TSV_HEADER)
+        csv_fh.writelines(map(_format_tsv_row, ynab_transactions))
+
+
+def _format_tsv_row(transaction: dict) -> bytes:
+    """Format a transaction as a UTF-8 encoded row of the .tsv.
+
+    Args:
+        transaction: JSON object corresponding to a transaction
+    """
+    account, flag, date, payee, category, memo, cleared, milliunits = _tsv_fields(transaction)
+
+    # Amount is given in milliunits:
+    #   1863600 instead of 1863.600
+    #   -33710 instead of -33.710
+    kronor, ore = divmod(abs(milliunits), 1000)
+    amount = f"{kronor},{ore // 10:02d}kr"
+
+    if milliunits < 0:
+        outflow, inflow = amount, "0,00kr"
+    else:
+        outflow, inflow = "0,00kr", amount
 
-        for transaction in ynab_transactions:
-
-            # Amount is given as:
-            #   1863600 instead of 1863.600
-            #   -33710 instead of -33.710
-            before_dec = str(transaction["amount"])[:-3]
-            after_dec = str(transaction["amount"])[-3:]
-            amount = f"{before_dec},{after_dec[:-1]}kr"
-
-            if amount[0] == "-":
-                outflow = amount[1:]
-                inflow = "0,00kr"
-            else:
-                inflow = amount
-                outflow = "0,00kr"
-
-            csv_fh.write(
-                f"\"{transaction['account_name']}\"\t"
-                + f"\"{transaction['flag_color']}\"\t"
-                + f"\"{transaction['date']}\"\t"
-                + f"\"{transaction['payee_name']}\"\t"
-                + f"\"{transaction['category_name']}\"\t"
-                + f"\"{transaction['category_name']}\"\t"
-                + f"\"{transaction['category_name']}\"\t"
-                + f"\"{transaction['memo']}\"\t"
-                + f"{outflow}\t"
-                + f"{inflow}\t"
-                + f"\"{transaction['cleared']}\"\n"
-            )
+    return _format_tsv_fields(account, flag, date, payee, category, memo, outflow, inflow, cleared).encode("utf-8")
@@ -1,9 +1,10 @@
-import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
 import sys
+from types import SimpleNamespace
 
 from loguru import logger
 
-from dataframes import compare_ynab_to_bank, extract_ica_df, extract_swedbank_df
 from ynab_api import download_ynab_data, get_api_token
 
 
@@ -19,12 +20,6 @@ def main(args):
         Filter Date: Earliest date to take into consideration when parsing data
     """
 
-    # (YNAB Account Name, Path to data file, Name of bank, Function that parses data file into a DataFrame)
-    LIST_OF_BANKS = [
-        ("Checking", "data/swedbank.csv", "Swedbank", extract_swedbank_df),
-        ("ICA Banken", "data/ica.csv", "ICA Banken", extract_ica_df),
-    ]
-
     # Query YNAB API for data
     if api_token := get_api_token():
         download_ynab_data(api_token, args.budget_name, args.filter_date)
@@ -37,18 +32,80 @@ def main(args):
         )
         ynab_tsv = "data/ynab.tsv"
 
-    for account, bank_file, bank, extraction_function in LIST_OF_BANKS:
-        compare_ynab_to_bank(
-            ynab_tsv,
-            account,
-            bank_file,
-            bank,
-            extraction_function,
-            args.filter_date,
-        )
+    # Imported here, as pandas is slow to import and not needed until now
+    from dataframes import compare_ynab_to_bank, extract_ica_df, extract_swedbank_df, extract_ynab_df
+
+    # (YNAB Account Name, Path to data file, Name of bank, Function that parses data file into a DataFrame)
+    LIST_OF_BANKS = [
+        ("Checking", "data/swedbank.csv", "Swedbank", extract_swedbank_df),
+        ("ICA Banken", "data/ica.csv", "ICA Banken", extract_ica_df),
+    ]
 
+    # The banks are compared independently of each other, so each one gets a process of its own.
+    # The YNAB .tsv is parsed once, here, and each worker is only sent the transactions of its account.
+    # Workers do not necessarily inherit the logging configuration (e.g. when spawned), so they set it up themselves
+    with ProcessPoolExecutor(
+        max_workers=min(len(LIST_OF_BANKS), os.cpu_count() or 1),
+        initializer=configure_logging,
+        initargs=(args.verbose,),
+    ) as executor:
+        comparisons = [
+            executor.submit(
+                compare_ynab_to_bank,
+                extract_ynab_df(ynab_tsv, account, args.filter_date),
+                account,
+                bank_file,
+                bank,
+                extraction_function,
+                args.filter_date,
+            )
+            for account, bank_file, bank, extraction_function in LIST_OF_BANKS
+        ]
+
+        for comparison in comparisons:
+            comparison.result()
+
+
+def configure_logging(verbose: bool) -> None:
+    """Log to stderr, including debug messages if verbose."""
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if verbose else "INFO")
+
+
+def parse_args(argv):
+    """Parse the command line arguments.
+
+    The arguments are few enough to be parsed by hand. argparse is only
+    imported when asked for --help, or to report an invalid command line.
+
+    Args:
+        argv: The command line arguments, excluding the program name
+    Returns:
+        The parsed arguments
+    """
+
+    args = {"filter_date": None, "budget_name": None, "verbose": False}
+    options = {"--filter-date": "filter_date", "--budget-name": "budget_name"}
+
+    arguments = iter(argv)
+    for argument in arguments:
+        if argument in options:
+            args[options[argument]] = next(arguments, None)
+        elif argument in ("-v", "--verbose"):
+            args["verbose"] = True
+        else:
+            break
+    else:
+        if args["filter_date"] is not None and args["budget_name"] is not None:
+            return SimpleNamespace(**args)
+
+    return _parse_args_with_argparse(argv)
+
+
+def _parse_args_with_argparse(argv):
+    """Parse the command line arguments with argparse, which prints help and usage errors."""
+    import argparse
 
-if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--filter-date", required=True, help="Earliest date to take into consideration."
@@ -66,13 +123,10 @@ if __name__ == "__main__":
         help="",
     )
 
-    args = parser.parse_args()
+    return parser.parse_args(argv)
 
-    if args.verbose:
-        logger.remove()
-        logger.add(sys.stderr, level="DEBUG")
-    else:
-        logger.remove()
-        logger.add(sys.stderr, level="INFO")
 
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    configure_logging(args.verbose)
     main(args)